@@ -22,6 +22,49 @@ class Settings(BaseSettings):
         validation_alias="DATABASE_URL"
     )
 
+    # Agendador de chamadas externas (app/tools/scheduler.py)
+    # Quota diária em unidades (search.list do YouTube custa 100, videos.list custa 1)
+    youtube_daily_quota: int = Field(10000, validation_alias="YOUTUBE_DAILY_QUOTA")
+    # Token bucket em pedidos HTTP por segundo (não em unidades de quota)
+    youtube_rate_per_second: float = Field(5.0, validation_alias="YOUTUBE_RATE_PER_SECOND")
+    youtube_burst: int = Field(20, validation_alias="YOUTUBE_BURST")
+    # O TMDB não tem quota diária publicada, apenas limite por segundo (0 = sem quota diária)
+    tmdb_daily_quota: int = Field(0, validation_alias="TMDB_DAILY_QUOTA")
+    tmdb_rate_per_second: float = Field(20.0, validation_alias="TMDB_RATE_PER_SECOND")
+    tmdb_burst: int = Field(40, validation_alias="TMDB_BURST")
+    # Fração da quota diária reservada para a fila interativa (a fila de background não a pode gastar)
+    upstream_interactive_reserve: float = Field(0.2, validation_alias="UPSTREAM_INTERACTIVE_RESERVE")
+    upstream_max_retries: int = Field(3, validation_alias="UPSTREAM_MAX_RETRIES")
+    upstream_backoff_base_seconds: float = Field(0.5, validation_alias="UPSTREAM_BACKOFF_BASE_SECONDS")
+    upstream_backoff_max_seconds: float = Field(8.0, validation_alias="UPSTREAM_BACKOFF_MAX_SECONDS")
+    # Tempo máximo que um pedido interativo espera por tokens antes de cair para o cache/catálogo
+    upstream_interactive_max_wait_seconds: float = Field(2.0, validation_alias="UPSTREAM_INTERACTIVE_MAX_WAIT_SECONDS")
+    # Prazo total de um pedido interativo (tokens + chamadas HTTP + backoff); depois cai para o cache/catálogo
+    upstream_interactive_deadline_seconds: float = Field(5.0, validation_alias="UPSTREAM_INTERACTIVE_DEADLINE_SECONDS")
+    upstream_cache_ttl_seconds: int = Field(6 * 3600, validation_alias="UPSTREAM_CACHE_TTL_SECONDS")
+    # Entradas expiradas ficam como fallback "stale" até este horizonte; o cache é um LRU limitado
+    upstream_cache_stale_seconds: int = Field(7 * 24 * 3600, validation_alias="UPSTREAM_CACHE_STALE_SECONDS")
+    upstream_cache_max_entries: int = Field(2000, validation_alias="UPSTREAM_CACHE_MAX_ENTRIES")
+
+    # Índice de embeddings do catálogo (app/vector_index.py)
+    # "none" (float32 exato), "float16" ou "int8"
+    embedding_quantization: str = Field("none", validation_alias="EMBEDDING_QUANTIZATION")
+    # Quantos candidatos da passagem quantizada são re-pontuados em float32
+    embedding_rerank_candidates: int = Field(300, validation_alias="EMBEDDING_RERANK_CANDIDATES")
+    # Recall@k mínimo face à busca exata; abaixo disso o nº de candidatos é aumentado
+    embedding_recall_target: float = Field(0.95, validation_alias="EMBEDDING_RECALL_TARGET")
+    # k medido no recall e nº de itens que recebem pontuação semântica no recomendador
+    embedding_recall_k: int = Field(20, validation_alias="EMBEDDING_RECALL_K")
+    # Nº de consultas de amostra usadas para medir o recall (0 = não medir)
+    embedding_recall_sample: int = Field(64, validation_alias="EMBEDDING_RECALL_SAMPLE")
+    # Peso do componente semântico na pontuação híbrida (acima de 0.5 um match só semântico passa o corte)
+    embedding_semantic_weight: float = Field(0.8, validation_alias="EMBEDDING_SEMANTIC_WEIGHT")
+    # Cosseno (absoluto) tratado como similaridade máxima; text-embedding-3-small raramente passa de ~0.6
+    embedding_similarity_full_score: float = Field(0.6, validation_alias="EMBEDDING_SIMILARITY_FULL_SCORE")
+    # Cache por worker dos vetores de utilizador quantizados
+    embedding_user_cache_size: int = Field(10000, validation_alias="EMBEDDING_USER_CACHE_SIZE")
+    embedding_user_cache_ttl_seconds: int = Field(300, validation_alias="EMBEDDING_USER_CACHE_TTL_SECONDS")
+
 # Load + validate
 try:
     settings = Settings()
@@ -4,6 +4,10 @@ client = OpenAI(api_key=settings.openai_api_key)
 async def embed_text(text: str) -> list:
     res = client.embeddings.create(model="text-embedding-3-small", input=text)
     return res.data[0].embedding
+async def embed_texts(texts: list) -> list:
+    """Embeddings de vários textos num só pedido (mesma ordem de `texts`)."""
+    res = client.embeddings.create(model="text-embedding-3-small", input=texts)
+    return [d.embedding for d in sorted(res.data, key=lambda d: d.index)]
 def cosine_similarity(a, b):
     import math
     dot = sum(x*y for x, y in zip(a, b))
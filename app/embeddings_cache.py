@@ -14,6 +14,14 @@ class EmbeddingEntry(Base):
     text = Column(String)
     embedding = Column(String)
 Base.metadata.create_all(bind=engine)
+# Incrementado a cada escrita neste processo (permite invalidar índices construídos a partir do cache)
+_version = 0
+def cache_version() -> tuple:
+    """Versão do cache: escritas deste processo + nº de linhas (apanha inserções de outros workers)."""
+    session = SessionLocal()
+    count = session.query(sa.func.count(EmbeddingEntry.id)).scalar()
+    session.close()
+    return (_version, count)
 def get_embedding(id: str):
     session = SessionLocal()
     row = session.query(EmbeddingEntry).filter_by(id=id).first()
@@ -21,7 +29,20 @@ def get_embedding(id: str):
     if not row:
         return None
     return json.loads(row.embedding)
+def get_embeddings(ids: list) -> dict:
+    """Carrega vários embeddings numa única sessão/consulta. Ids sem embedding ficam de fora."""
+    if not ids:
+        return {}
+    ids = list(ids)
+    session = SessionLocal()
+    rows = []
+    # Lotes abaixo do limite de parâmetros do SQLite
+    for start in range(0, len(ids), 500):
+        rows += session.query(EmbeddingEntry).filter(EmbeddingEntry.id.in_(ids[start:start + 500])).all()
+    session.close()
+    return {row.id: json.loads(row.embedding) for row in rows}
 def set_embedding(id: str, text: str, embedding: list):
+    global _version
     session = SessionLocal()
     row = session.query(EmbeddingEntry).filter_by(id=id).first()
     if row:
@@ -32,3 +53,4 @@ def set_embedding(id: str, text: str, embedding: list):
         session.add(row)
     session.commit()
     session.close()
+    _version += 1
@@ -2,6 +2,7 @@ from typing import List, Optional
 from sqlalchemy.orm import Session
 from . import models # Importa o modelo Feedback do DB
 from app.feedback import Feedback # Sua classe Pydantic Feedback original
+from app.vector_index import user_vectors
 
 # Removemos o armazenamento em memória (_feedback_storage)
 
@@ -25,6 +26,8 @@ def save_feedback(db: Session, fb: Feedback):
     db.add(db_feedback)
     db.commit() # Salva no Supabase
     db.refresh(db_feedback)
+    # O vetor do utilizador em cache deixa de refletir os "likes"
+    user_vectors.invalidate(fb.user_id)
     return db_feedback
 
 def load_feedback_for_user(db: Session, user_id: str) -> List[models.Feedback]:
@@ -3,8 +3,117 @@ from typing import List, Optional
 from sqlalchemy.orm import Session
 from app.schemas import RecommendRequest, Recommendation, MediaItem # Import Corrigido
 from app.models import Media
+from app.feedback_store import load_embeddings_for_user
+from app import embeddings_cache
+from app.embeddings import embed_texts
+from app.vector_index import EmbeddingIndex, user_vectors
+from app.config import settings
+import asyncio
 import random
 
+def load_catalog(db: Session) -> List[MediaItem]:
+    """Carrega o catálogo 'Media' do DB (com fallback para o mock)."""
+    # Apenas o campo 'title' é necessário para a simulação de Content-Based
+    try:
+        all_media: List[Media] = db.query(Media).all()
+    except Exception as e:
+        # Se a tabela Media estiver vazia ou com erro, usamos um fallback
+        print(f"ERRO: Falha ao carregar mídia do DB. Usando mock. {e}")
+        from app.recommender import MOCK_DATA
+        all_media = MOCK_DATA
+
+    # Mapear para o formato de esquema e selecionar apenas os títulos
+    return [MediaItem.from_orm(item) for item in all_media]
+
+# Índice do catálogo por worker. É sempre construído fora do caminho do pedido (num thread
+# do executor) e trocado quando fica pronto; até lá continua a servir-se o índice anterior.
+_catalog_index: Optional[EmbeddingIndex] = None
+_catalog_index_key: Optional[tuple] = None
+_rebuild_task: Optional[asyncio.Task] = None
+# Durante /embeddings/refresh o cache muda a cada lote; a reconstrução fica para o fim
+_refreshing = False
+
+def _build_catalog_index(ids: tuple) -> Optional[EmbeddingIndex]:
+    found = embeddings_cache.get_embeddings(ids)
+    index_ids = [item_id for item_id in ids if item_id in found]
+    return EmbeddingIndex(index_ids, [found[i] for i in index_ids]) if index_ids else None
+
+async def rebuild_catalog_index(media_items: List[MediaItem]) -> Optional[EmbeddingIndex]:
+    """
+    Reconstrói o índice dos itens do catálogo com embedding em cache (None se nenhum tiver)
+    sem bloquear o event loop, e passa a servi-lo. A representação segue
+    settings.embedding_quantization.
+    """
+    global _catalog_index, _catalog_index_key
+    loop = asyncio.get_running_loop()
+    ids = tuple(str(item.id) for item in media_items)
+    # A versão é lida antes da construção: escritas concorrentes provocam nova reconstrução
+    key = (ids, await loop.run_in_executor(None, embeddings_cache.cache_version))
+    index = await loop.run_in_executor(None, _build_catalog_index, ids)
+    _catalog_index, _catalog_index_key = index, key
+    return index
+
+async def _rebuild_in_background(media_items: List[MediaItem]):
+    try:
+        await rebuild_catalog_index(media_items)
+    except Exception as e:
+        print(f"ERRO: Falha ao reconstruir o índice de embeddings. {e}")
+
+def get_catalog_index(media_items: List[MediaItem]) -> Optional[EmbeddingIndex]:
+    """
+    Devolve o índice atualmente servido (pode ser None ou estar desatualizado).
+    Se o catálogo ou o cache de embeddings mudaram, agenda uma reconstrução em segundo plano.
+    """
+    global _rebuild_task
+    key = (tuple(str(item.id) for item in media_items), embeddings_cache.cache_version())
+    if key != _catalog_index_key and not _refreshing and (_rebuild_task is None or _rebuild_task.done()):
+        _rebuild_task = asyncio.get_running_loop().create_task(_rebuild_in_background(media_items))
+    return _catalog_index
+
+def catalog_index_status() -> dict:
+    """Estado do índice do catálogo neste worker (modo, memória e recall medido)."""
+    rebuilding = _refreshing or (_rebuild_task is not None and not _rebuild_task.done())
+    if _catalog_index is None:
+        return {"built": _catalog_index_key is not None, "rebuilding": rebuilding, "items": 0}
+    return {"built": True, "rebuilding": rebuilding, **_catalog_index.stats()}
+
+async def refresh_catalog_embeddings(media_items: List[MediaItem], batch_size: int = 100) -> int:
+    """
+    Gera e guarda no cache os embeddings dos itens do catálogo que ainda não os têm
+    e reconstrói o índice uma única vez no fim. Devolve o nº de itens novos.
+    """
+    global _refreshing
+    _refreshing = True
+    try:
+        existing = embeddings_cache.get_embeddings([str(item.id) for item in media_items])
+        missing = [item for item in media_items if str(item.id) not in existing]
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            texts = [f"{item.title} {item.description or ''}" for item in batch]
+            for item, text, emb in zip(batch, texts, await embed_texts(texts)):
+                embeddings_cache.set_embedding(str(item.id), text, emb)
+    finally:
+        _refreshing = False
+    await rebuild_catalog_index(media_items)
+    return len(missing)
+
+def semantic_scores_for_user(db: Session, user_id: str, media_items: List[MediaItem]) -> dict:
+    """
+    Similaridade de cosseno (absoluta, >= 0) entre o vetor do utilizador e os
+    `embedding_recall_k` itens mais próximos do catálogo. Itens fora desse top não aparecem.
+    """
+    index = get_catalog_index(media_items)
+    if index is None:
+        return {}
+    user_vector = user_vectors.get(user_id)
+    if user_vector is None:
+        liked_embeddings = load_embeddings_for_user(db, user_id)
+        if not liked_embeddings:
+            return {}
+        user_vector = user_vectors.set(user_id, liked_embeddings)
+    # Primeira passagem no índice (possivelmente quantizado) + re-pontuação exata em float32
+    return {item_id: max(0.0, score) for item_id, score in index.search(user_vector)}
+
 # --- Lógica do Recomendador Híbrido ---
 
 async def hybrid_recommend(req: RecommendRequest, user_id: str, limit: int, db: Session) -> List[Recommendation]:
@@ -16,18 +125,14 @@ async def hybrid_recommend(req: RecommendRequest, user_id: str, limit: int, db:
     """
     
     # 1. Obter todos os itens do catálogo (Content-Based Data Source)
-    # Apenas o campo 'title' é necessário para a simulação de Content-Based
+    media_items: List[MediaItem] = load_catalog(db)
+    
+    # 1b. Similaridade semântica (embeddings dos itens curtidos vs. catálogo)
+    semantic_scores = {}
     try:
-        all_media: List[Media] = db.query(Media).all()
+        semantic_scores = semantic_scores_for_user(db, user_id, media_items)
     except Exception as e:
-        # Se a tabela Media estiver vazia ou com erro, usamos um fallback
-        print(f"ERRO: Falha ao carregar mídia do DB. Usando mock. {e}")
-        from app.recommender import MOCK_DATA
-        all_media = MOCK_DATA
-
-    # Mapear para o formato de esquema e selecionar apenas os títulos
-    media_items: List[MediaItem] = [MediaItem.from_orm(item) for item in all_media]
-    
+        print(f"ERRO: Falha na similaridade por embeddings. Usando apenas palavras-chave. {e}")
     
     # 2. Simulação de Content-Based Scoring
     # Baseado na string de preferência do usuário (req.preferences)
@@ -51,12 +156,22 @@ async def hybrid_recommend(req: RecommendRequest, user_id: str, limit: int, db:
         
         # Pontuação Híbrida: Combinação Simples
         final_score = score_content * 0.7 + score_cf * 0.3
+        reason = "Conteúdo (70%) + Similaridade de Usuários (30%)"
+        
+        # Componente semântico: a similaridade com os itens curtidos, normalizada pelo cosseno
+        # considerado "match perfeito", aproxima a pontuação de 1 (nunca a reduz; sem "likes"
+        # o resultado é o de sempre). Com o peso por omissão um item só semântico passa o corte.
+        cosine = semantic_scores.get(str(item.id), 0.0)
+        score_semantic = min(1.0, cosine / settings.embedding_similarity_full_score)
+        if score_semantic > 0:
+            final_score += settings.embedding_semantic_weight * score_semantic * (1 - final_score)
+            reason += " + Semelhante aos seus gostos"
         
         if final_score > 0.5:
             scored_items.append(Recommendation(
                 item=item,
                 score=round(final_score, 2),
-                reason="Conteúdo (70%) + Similaridade de Usuários (30%)"
+                reason=reason
             ))
 
     # 3. Filtragem e Classificação
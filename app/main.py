@@ -103,6 +103,20 @@ async def recommend_endpoint(
         print(f"Erro na recomendação: {e}") 
         raise HTTPException(status_code=500, detail=f"Erro no serviço de recomendação: {str(e)}")
 
+# Endpoints do índice de embeddings do catálogo
+@app.post("/embeddings/refresh")
+async def refresh_embeddings(db: Session = Depends(get_db)):
+    """Gera os embeddings em falta para os itens do catálogo."""
+    from app.hybrid_recommender import load_catalog, refresh_catalog_embeddings
+    added = await refresh_catalog_embeddings(load_catalog(db))
+    return {"status": "ok", "added": added}
+
+@app.get("/embeddings/status")
+def embeddings_status():
+    """Estado do índice neste worker (modo de quantização, memória, recall medido)."""
+    from app.hybrid_recommender import catalog_index_status
+    return catalog_index_status()
+
 # Endpoint de feedback (CORRIGIDO: Agora injeta DB e chama save_feedback com 'db')
 @app.post("/feedback")
 async def post_feedback(feedback: FeedbackRequest, db: Session = Depends(get_db)): # <-- FIX 1: INJETAR DB
@@ -18,3 +18,12 @@ class Feedback(Base):
     item_id = Column(String, index=True, nullable=False)
     liked = Column(Boolean, nullable=False)
     embedding = Column(JSONB, nullable=True) # Armazena o vetor de embedding
+
+class Media(Base):
+    __tablename__ = "media"
+
+    id = Column(Integer, primary_key=True, index=True)
+    title = Column(String, nullable=False)
+    description = Column(String, nullable=False)
+    platform = Column(String, nullable=False)
+    duration_minutes = Column(Integer, nullable=True)
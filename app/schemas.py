@@ -1,11 +1,14 @@
 # Ficheiro: app/schemas.py
 from typing import List, Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 # --- Modelos de Dados ---
 
 class MediaItem(BaseModel):
     """Representa um item de conteúdo multimédia no nosso catálogo."""
+    # Permite MediaItem.from_orm(...) a partir do modelo SQLAlchemy 'Media' (Pydantic v2)
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     title: str
     description: str
@@ -0,0 +1,300 @@
+# Ficheiro: app/tools/scheduler.py
+"""
+Agendador de chamadas às APIs externas (YouTube, TMDB).
+
+Cada API tem um token bucket (pedidos HTTP por segundo + rajada) e uma quota
+diária em unidades (custo de cada chamada), reiniciada à meia-noite do fuso
+horário da API.
+As chamadas entram por uma de duas filas:
+
+- "interactive": pedidos de utilizadores; podem gastar toda a quota diária,
+  esperam no máximo `upstream_interactive_max_wait_seconds` por tokens e têm
+  um prazo total (`upstream_interactive_deadline_seconds`) que cobre tokens,
+  chamadas HTTP e esperas entre tentativas.
+- "background": warmup/refresh; nunca gastam a reserva interativa da quota e
+  cedem a vez enquanto houver pedidos interativos à espera.
+
+Respostas 429/5xx (e erros de transporte) são repetidas com backoff exponencial
+e jitter. Quando a quota acaba, as tentativas se esgotam ou o prazo passa, o agendador devolve o último resultado em cache
+para a mesma chave ou o `fallback` (lista vazia = só catálogo local). O cache
+é um LRU limitado e descarta entradas mais antigas que o horizonte de "stale".
+"""
+import asyncio
+import random
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone, tzinfo
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import httpx
+
+from app.config import settings
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+LANES = (INTERACTIVE, BACKGROUND)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Motivos devolvidos pelo YouTube (HTTP 403) quando a quota diária acabou
+QUOTA_EXHAUSTED_REASONS = ("quotaExceeded", "dailyLimitExceeded")
+# Limites de curto prazo (por utilizador/segundo) também vêm como 403, mas são repetíveis
+RATE_LIMITED_REASONS = ("rateLimitExceeded", "userRateLimitExceeded")
+# A quota do YouTube reinicia à meia-noite do Pacífico
+PACIFIC = ZoneInfo("America/Los_Angeles")
+
+
+class UpstreamBudgetExhausted(Exception):
+    """Não há tokens/quota disponíveis para a chamada nesta fila."""
+
+
+class TokenBucket:
+    """Token bucket simples: `rate` tokens por segundo até `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, cost: int) -> float:
+        """Segundos até haver `cost` tokens (um custo maior que a capacidade exige o bucket cheio)."""
+        self._refill()
+        needed = min(cost, self.capacity) - self.tokens
+        if needed <= 0:
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return needed / self.rate
+
+    def take(self, cost: int):
+        self._refill()
+        self.tokens -= cost
+
+
+class UpstreamAPI:
+    """Estado de uma API externa: bucket, quota diária e cache de resultados."""
+
+    def __init__(self, name: str, rate: float, burst: int, daily_quota: int, cache_ttl: int,
+                 quota_tz: tzinfo = timezone.utc):
+        self.name = name
+        # O bucket conta pedidos HTTP; o custo em unidades vai apenas para a quota diária
+        self.bucket = TokenBucket(rate, burst)
+        # daily_quota <= 0 significa "sem quota diária" (apenas o token bucket)
+        self.daily_quota = daily_quota
+        self.quota_tz = quota_tz
+        self.cache_ttl = cache_ttl
+        self.spent = 0
+        self.day = self._today()
+        self.interactive_waiting = 0
+        self.cache: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def _today(self):
+        return datetime.now(self.quota_tz).date()
+
+    def _roll_day(self):
+        today = self._today()
+        if today != self.day:
+            self.day = today
+            self.spent = 0
+
+    def remaining(self) -> Optional[int]:
+        self._roll_day()
+        if self.daily_quota <= 0:
+            return None
+        return max(0, self.daily_quota - self.spent)
+
+    def has_budget(self, cost: int, lane: str) -> bool:
+        remaining = self.remaining()
+        if remaining is None:
+            return True
+        reserve = 0
+        if lane == BACKGROUND:
+            reserve = int(self.daily_quota * settings.upstream_interactive_reserve)
+        return remaining - cost >= reserve
+
+    def spend(self, cost: int):
+        self._roll_day()
+        self.spent += cost
+
+    def exhaust(self):
+        """Marca a quota do dia como esgotada (a API externa disse que acabou)."""
+        self._roll_day()
+        if self.daily_quota > 0:
+            self.spent = self.daily_quota
+
+    def cached(self, key: Optional[str], allow_stale: bool = False):
+        if key is None or key not in self.cache:
+            return None
+        stored_at, value = self.cache[key]
+        age = time.time() - stored_at
+        if age > settings.upstream_cache_stale_seconds:
+            del self.cache[key]
+            return None
+        if allow_stale or age <= self.cache_ttl:
+            self.cache.move_to_end(key)
+            return value
+        return None
+
+    def store(self, key: Optional[str], value: Any):
+        if key is None:
+            return
+        self.cache[key] = (time.time(), value)
+        self.cache.move_to_end(key)
+        while len(self.cache) > settings.upstream_cache_max_entries:
+            self.cache.popitem(last=False)
+
+
+class UpstreamScheduler:
+    """Coordena as chamadas às APIs externas registadas."""
+
+    def __init__(self):
+        self.apis: Dict[str, UpstreamAPI] = {}
+
+    def register(self, name: str, rate: float, burst: int, daily_quota: int = 0,
+                 cache_ttl: int = 0, quota_tz: tzinfo = timezone.utc) -> UpstreamAPI:
+        api = UpstreamAPI(name, rate=rate, burst=burst, daily_quota=daily_quota,
+                          cache_ttl=cache_ttl, quota_tz=quota_tz)
+        self.apis[name] = api
+        return api
+
+    def status(self) -> Dict[str, dict]:
+        """Resumo do consumo por API (útil para diagnóstico)."""
+        return {
+            name: {"spent": api.spent, "remaining": api.remaining(), "daily_quota": api.daily_quota}
+            for name, api in self.apis.items()
+        }
+
+    async def _acquire(self, api: UpstreamAPI, cost: int, requests: int, lane: str,
+                       deadline: Optional[float] = None):
+        loop = asyncio.get_running_loop()
+        if lane == INTERACTIVE:
+            wait_deadline = loop.time() + settings.upstream_interactive_max_wait_seconds
+            deadline = wait_deadline if deadline is None else min(deadline, wait_deadline)
+            api.interactive_waiting += 1
+        try:
+            while True:
+                if not api.has_budget(cost, lane):
+                    raise UpstreamBudgetExhausted(f"{api.name}: quota diária insuficiente ({lane})")
+                if lane == BACKGROUND and api.interactive_waiting:
+                    # Cede a vez aos pedidos de utilizadores
+                    wait = 0.05
+                else:
+                    wait = api.bucket.time_until(requests)
+                    if wait <= 0:
+                        api.bucket.take(requests)
+                        api.spend(cost)
+                        return
+                if deadline is not None and loop.time() + wait > deadline:
+                    raise UpstreamBudgetExhausted(f"{api.name}: limite por segundo atingido ({lane})")
+                await asyncio.sleep(wait)
+        finally:
+            if lane == INTERACTIVE:
+                api.interactive_waiting -= 1
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        # Backoff exponencial com "full jitter"; respeita Retry-After se vier na resposta
+        cap = min(settings.upstream_backoff_max_seconds,
+                  settings.upstream_backoff_base_seconds * (2 ** attempt))
+        delay = random.uniform(0, cap)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("Retry-After", 0))
+            except ValueError:
+                retry_after = 0
+            delay = max(delay, min(retry_after, settings.upstream_backoff_max_seconds))
+        return delay
+
+    def _shed(self, api: UpstreamAPI, cache_key: Optional[str], fallback: Any, reason: Exception):
+        stale = api.cached(cache_key, allow_stale=True)
+        print(f"AVISO: chamada a '{api.name}' descartada ({reason}). "
+              f"{'Usando cache.' if stale is not None else 'Usando apenas o catálogo.'}")
+        return stale if stale is not None else fallback
+
+    async def run(self, api_name: str, func: Callable[[], Awaitable[Any]], *, cost: int = 1,
+                  requests: int = 1, lane: str = INTERACTIVE, cache_key: Optional[str] = None, fallback: Any = None):
+        """
+        Executa `func` (uma corrotina sem argumentos que faz as chamadas HTTP)
+        respeitando o token bucket, a quota diária e a fila indicada.
+
+        `cost` (unidades de quota) é cobrado em cada tentativa (o YouTube cobra as
+        chamadas falhadas); `requests` é o nº de pedidos HTTP feitos por `func`,
+        descontado do token bucket.
+        Se houver resultado em cache ainda válido para `cache_key`, a quota não é gasta.
+        Erros repetíveis que persistem após as tentativas, ou um pedido interativo
+        que ultrapassa o prazo total, devolvem o cache/`fallback`; só erros 4xx não
+        repetíveis são propagados.
+        """
+        if lane not in LANES:
+            raise ValueError(f"Fila desconhecida: {lane}")
+        api = self.apis[api_name]
+
+        fresh = api.cached(cache_key)
+        if fresh is not None:
+            return fresh
+
+        loop = asyncio.get_running_loop()
+        deadline = None
+        if lane == INTERACTIVE:
+            deadline = loop.time() + settings.upstream_interactive_deadline_seconds
+
+        attempt = 0
+        while True:
+            try:
+                await self._acquire(api, cost, requests, lane, deadline)
+            except UpstreamBudgetExhausted as e:
+                return self._shed(api, cache_key, fallback, e)
+
+            response = None
+            try:
+                timeout = None if deadline is None else max(0.0, deadline - loop.time())
+                result = await asyncio.wait_for(func(), timeout=timeout)
+                api.store(cache_key, result)
+                return result
+            except asyncio.TimeoutError:
+                return self._shed(api, cache_key, fallback, UpstreamBudgetExhausted(
+                    f"{api.name}: prazo do pedido interativo ultrapassado"))
+            except httpx.HTTPStatusError as e:
+                response = e.response
+                if response.status_code == 403 and any(r in response.text for r in QUOTA_EXHAUSTED_REASONS):
+                    api.exhaust()
+                    return self._shed(api, cache_key, fallback, e)
+                retryable = response.status_code in RETRYABLE_STATUS or (
+                    response.status_code == 403 and any(r in response.text for r in RATE_LIMITED_REASONS)
+                )
+                if not retryable:
+                    raise
+                error = e
+            except httpx.TransportError as e:
+                error = e
+
+            if attempt >= settings.upstream_max_retries:
+                return self._shed(api, cache_key, fallback, error)
+            delay = self._backoff(attempt, response)
+            if deadline is not None and loop.time() + delay > deadline:
+                return self._shed(api, cache_key, fallback, error)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+scheduler = UpstreamScheduler()
+scheduler.register(
+    "youtube",
+    rate=settings.youtube_rate_per_second,
+    burst=settings.youtube_burst,
+    daily_quota=settings.youtube_daily_quota,
+    cache_ttl=settings.upstream_cache_ttl_seconds,
+    quota_tz=PACIFIC,
+)
+scheduler.register(
+    "tmdb",
+    rate=settings.tmdb_rate_per_second,
+    burst=settings.tmdb_burst,
+    daily_quota=settings.tmdb_daily_quota,
+    cache_ttl=settings.upstream_cache_ttl_seconds,
+)
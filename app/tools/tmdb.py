@@ -1,9 +1,19 @@
 import httpx
 from typing import List
 from app.config import settings
+from app.tools.scheduler import scheduler, INTERACTIVE
 TMDB_SEARCH_MOVIE = "https://api.themoviedb.org/3/search/movie"
 TMDB_SEARCH_TV = "https://api.themoviedb.org/3/search/tv"
-async def search_tmdb(query: str, max_results: int = 5, media_type: str = "movie") -> List[dict]:
+async def search_tmdb(query: str, max_results: int = 5, media_type: str = "movie", lane: str = INTERACTIVE) -> List[dict]:
+    return await scheduler.run(
+        "tmdb",
+        lambda: _search_tmdb(query, max_results, media_type),
+        cost=1,
+        lane=lane,
+        cache_key=f"{media_type}:{max_results}:{query.strip().lower()}",
+        fallback=[],
+    )
+async def _search_tmdb(query: str, max_results: int, media_type: str) -> List[dict]:
     url = TMDB_SEARCH_MOVIE if media_type == "movie" else TMDB_SEARCH_TV
     params = {"api_key": settings.tmdb_api_key, "query": query, "page": 1}
     async with httpx.AsyncClient(timeout=15) as client:
@@ -1,9 +1,22 @@
 import httpx
 from typing import List
 from app.config import settings
+from app.tools.scheduler import scheduler, INTERACTIVE
 YOUTUBE_SEARCH_URL = "https://www.googleapis.com/youtube/v3/search"
 YOUTUBE_VIDEO_URL = "https://www.googleapis.com/youtube/v3/videos"
-async def search_youtube(query: str, max_results: int = 5) -> List[dict]:
+# Custo em unidades de quota: search.list (100) + videos.list (1)
+YOUTUBE_SEARCH_COST = 101
+async def search_youtube(query: str, max_results: int = 5, lane: str = INTERACTIVE) -> List[dict]:
+    return await scheduler.run(
+        "youtube",
+        lambda: _search_youtube(query, max_results),
+        cost=YOUTUBE_SEARCH_COST,
+        requests=2,
+        lane=lane,
+        cache_key=f"{max_results}:{query.strip().lower()}",
+        fallback=[],
+    )
+async def _search_youtube(query: str, max_results: int) -> List[dict]:
     params = {
         "part": "snippet",
         "q": query,
@@ -0,0 +1,233 @@
+# Ficheiro: app/vector_index.py
+"""
+Índice de embeddings do catálogo com representação quantizada opcional.
+
+Em modo "float16" ou "int8" o índice mantém em RAM apenas a matriz quantizada
+(2x ou 4x menos memória que float32); os vetores exatos ficam num ficheiro
+float32 mapeado em memória (np.memmap), lido só para os candidatos. A busca
+faz uma primeira passagem aproximada sobre a matriz quantizada e re-pontua os
+`rerank_candidates` melhores em float32 antes de devolver os `k` finais.
+
+Na construção, o recall@k (k = `embedding_recall_k`, o mesmo k usado pelo
+recomendador) face à busca exata é medido em vetores de utilizador sintéticos
+(média de alguns itens, como a média dos "likes"). Se ficar abaixo de
+`embedding_recall_target`, o nº de candidatos re-pontuados é aumentado.
+
+Os vetores de utilizador (média dos embeddings curtidos) também são guardados
+quantizados, num cache LRU por worker (`user_vectors`).
+"""
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+
+QUANTIZATION_MODES = ("none", "float16", "int8")
+# Linhas dequantizadas de cada vez na primeira passagem (limita a memória temporária)
+CHUNK_ROWS = 4096
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def quantize(matrix: np.ndarray, mode: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Quantiza uma matriz float32 (linhas = vetores).
+    Em int8 devolve também a escala simétrica de cada linha; nos outros modos a escala é None.
+    """
+    if mode == "none":
+        return matrix.astype(np.float32), None
+    if mode == "float16":
+        return matrix.astype(np.float16), None
+    if mode == "int8":
+        scales = np.abs(matrix).max(axis=-1, keepdims=True) / 127.0
+        scales[scales == 0] = 1.0
+        q = np.clip(np.rint(matrix / scales), -127, 127).astype(np.int8)
+        return q, scales.astype(np.float32).ravel()
+    raise ValueError(f"Modo de quantização desconhecido: {mode}")
+
+
+def dequantize(matrix: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+    out = matrix.astype(np.float32)
+    if scales is not None:
+        out *= scales[:, None] if out.ndim > 1 else scales[0]
+    return out
+
+
+def _memmap_float32(matrix: np.ndarray) -> np.memmap:
+    """Copia `matrix` para um ficheiro temporário float32 mapeado em memória (apagado ao fechar)."""
+    handle = tempfile.TemporaryFile(suffix=".f32")
+    mm = np.memmap(handle, dtype=np.float32, mode="w+", shape=matrix.shape)
+    mm[:] = matrix
+    mm.flush()
+    return mm
+
+
+class EmbeddingIndex:
+    """Índice de similaridade de cosseno sobre os embeddings do catálogo."""
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+        mode: Optional[str] = None,
+        rerank_candidates: Optional[int] = None,
+    ):
+        self.ids: List[str] = list(ids)
+        self.mode = mode or settings.embedding_quantization
+        if self.mode not in QUANTIZATION_MODES:
+            raise ValueError(f"Modo de quantização desconhecido: {self.mode}")
+        self.recall_k = settings.embedding_recall_k
+        # Nunca menos candidatos que os k devolvidos (e pelo menos 1, para a calibração poder crescer)
+        self.rerank_candidates = max(1, self.recall_k,
+                                     rerank_candidates or settings.embedding_rerank_candidates)
+        self.recall: Optional[float] = None
+
+        exact = _normalize(np.asarray(vectors, dtype=np.float32))
+        self.matrix, self.scales = quantize(exact, self.mode)
+        self._exact: Optional[np.ndarray] = None
+        if self.mode != "none":
+            self._exact = _memmap_float32(exact)
+
+        if self.mode != "none" and settings.embedding_recall_sample > 0:
+            self._calibrate(exact)
+        # A partir daqui o float32 em RAM deixa de ser referenciado (exceto em modo "none")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def nbytes(self) -> int:
+        """Memória ocupada pela representação guardada em RAM (sem o memmap)."""
+        return self.matrix.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "items": len(self.ids),
+            "bytes": self.nbytes(),
+            "rerank_candidates": self.rerank_candidates,
+            "recall_k": self.recall_k,
+            "recall": self.recall,
+        }
+
+    def _load_exact(self, rows: np.ndarray) -> np.ndarray:
+        # Leitura ordenada do memmap (acesso sequencial às páginas)
+        order = np.argsort(rows)
+        out = np.empty((len(rows), self.matrix.shape[1]), dtype=np.float32)
+        out[order] = self._exact[rows[order]]
+        return out
+
+    def _approx_scores(self, query: np.ndarray) -> np.ndarray:
+        if self.mode == "none":
+            return self.matrix @ query
+        if self.mode == "int8":
+            # A consulta também é quantizada; a sua escala é constante e não altera a ordem
+            q, _ = quantize(query[None, :], "int8")
+            query = q[0].astype(np.float32)
+        else:
+            query = query.astype(np.float16).astype(np.float32)
+        scores = np.empty(len(self.ids), dtype=np.float32)
+        for start in range(0, len(self.ids), CHUNK_ROWS):
+            chunk = self.matrix[start:start + CHUNK_ROWS].astype(np.float32)
+            scores[start:start + CHUNK_ROWS] = chunk @ query
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def _search(self, query: np.ndarray, k: int, candidates: int,
+                loader: Callable[[np.ndarray], np.ndarray]) -> List[Tuple[int, float]]:
+        approx = self._approx_scores(query)
+        k = min(k, len(self.ids))
+        if self.mode == "none":
+            top = np.argsort(-approx)[:k]
+            return [(int(i), float(approx[i])) for i in top]
+
+        n = min(max(candidates, k), len(self.ids))
+        cand = np.argpartition(-approx, n - 1)[:n] if n < len(self.ids) else np.arange(len(self.ids))
+        exact_scores = loader(cand) @ query
+        order = np.argsort(-exact_scores)[:k]
+        return [(int(cand[i]), float(exact_scores[i])) for i in order]
+
+    def search(self, query: Sequence[float], k: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Devolve os `k` ids mais semelhantes a `query` (por omissão `recall_k`, o k
+        em que o recall foi medido) com a similaridade exata em float32.
+        """
+        k = self.recall_k if k is None else k
+        if not self.ids or k <= 0:
+            return []
+        q = _normalize(np.asarray(query, dtype=np.float32))
+        found = self._search(q, k, self.rerank_candidates, self._load_exact)
+        return [(self.ids[i], score) for i, score in found]
+
+    def _calibrate(self, exact: np.ndarray):
+        """Mede o recall@k face à busca exata e aumenta os candidatos até atingir o alvo."""
+        k = min(self.recall_k, len(self.ids))
+        sample = min(settings.embedding_recall_sample, len(self.ids))
+        if k <= 0 or sample <= 0:
+            return
+        rng = np.random.default_rng(0)
+        # Consultas como as do recomendador: média de 1 a 5 itens "curtidos"
+        queries = _normalize(np.stack([
+            exact[rng.choice(len(self.ids), size=rng.integers(1, min(5, len(self.ids)) + 1), replace=False)].mean(axis=0)
+            for _ in range(sample)
+        ]))
+        truth = [set(np.argsort(-(exact @ q))[:k].tolist()) for q in queries]
+
+        while True:
+            hits = 0
+            for q, expected in zip(queries, truth):
+                found = self._search(q, k, self.rerank_candidates, lambda cand: exact[cand])
+                hits += len(expected & {i for i, _ in found})
+            self.recall = hits / (k * sample)
+            if self.recall >= settings.embedding_recall_target or self.rerank_candidates >= len(self.ids):
+                break
+            self.rerank_candidates = min(len(self.ids), self.rerank_candidates * 2)
+        print(f"Índice de embeddings ({self.mode}): {len(self.ids)} itens, "
+              f"recall@{k}={self.recall:.3f}, candidatos={self.rerank_candidates}, "
+              f"{self.nbytes() / 1e6:.1f} MB")
+
+
+class UserVectorCache:
+    """
+    Cache LRU por worker dos vetores de utilizador (média normalizada dos embeddings
+    curtidos), guardados na representação de `settings.embedding_quantization`.
+    As entradas expiram após `embedding_user_cache_ttl_seconds` para refletir
+    feedback gravado por outros workers.
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, Tuple[float, np.ndarray, Optional[np.ndarray]]]" = OrderedDict()
+
+    def get(self, user_id: str) -> Optional[np.ndarray]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        stored_at, vector, scale = entry
+        if time.time() - stored_at > settings.embedding_user_cache_ttl_seconds:
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return dequantize(vector, scale)
+
+    def set(self, user_id: str, embeddings: Sequence[Sequence[float]]) -> np.ndarray:
+        """Calcula o vetor do utilizador a partir dos embeddings curtidos e guarda-o quantizado."""
+        vector = _normalize(np.asarray(embeddings, dtype=np.float32).mean(axis=0))
+        q, scale = quantize(vector[None, :], settings.embedding_quantization)
+        self._entries[user_id] = (time.time(), q[0], scale)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > settings.embedding_user_cache_size:
+            self._entries.popitem(last=False)
+        return dequantize(q[0], scale)
+
+    def invalidate(self, user_id: str):
+        self._entries.pop(user_id, None)
+
+
+user_vectors = UserVectorCache()
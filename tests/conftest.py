@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# app.config exige a chave da OpenAI na importação
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+# Os módulos de cache/sessões criam ficheiros em ./data na importação
+os.chdir(tempfile.mkdtemp())
@@ -0,0 +1,124 @@
+import asyncio
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import embeddings_cache, hybrid_recommender
+from app.config import settings
+from app.database import SessionLocal
+from app.feedback import Feedback
+from app.feedback_store import save_feedback
+from app.recommender import MOCK_DATA
+from app.schemas import RecommendRequest
+from app.vector_index import user_vectors
+
+BLADE_RUNNER = 5  # "Filme cyberpunk e distópico." não tem nenhuma palavra-chave
+
+
+def item_vector(item_id, dim=32):
+    rng = np.random.default_rng(item_id)
+    return rng.normal(size=dim).tolist()
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(monkeypatch):
+    # Mesma ligação em memória para o event loop e para os threads do executor
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    embeddings_cache.Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(embeddings_cache, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(embeddings_cache, "_version", 0)
+    monkeypatch.setattr(hybrid_recommender, "_catalog_index", None)
+    monkeypatch.setattr(hybrid_recommender, "_catalog_index_key", None)
+    monkeypatch.setattr(hybrid_recommender, "_rebuild_task", None)
+    monkeypatch.setattr(settings, "embedding_quantization", "int8")
+    monkeypatch.setattr(settings, "embedding_recall_k", 3)
+    user_vectors._entries.clear()
+
+
+@pytest.fixture
+def fake_embed(monkeypatch):
+    calls = []
+
+    async def embed_texts(texts):
+        calls.append(texts)
+        by_title = {f"{item.title} {item.description}": item.id for item in MOCK_DATA}
+        return [item_vector(by_title[t]) for t in texts]
+
+    monkeypatch.setattr(hybrid_recommender, "embed_texts", embed_texts)
+    return calls
+
+
+def test_refresh_embeds_only_missing_items_and_builds_index(fake_embed):
+    embeddings_cache.set_embedding("1", "já existe", item_vector(1))
+
+    added = asyncio.run(hybrid_recommender.refresh_catalog_embeddings(MOCK_DATA, batch_size=3))
+
+    assert added == len(MOCK_DATA) - 1
+    assert [len(batch) for batch in fake_embed] == [3, 3, 1]
+    status = hybrid_recommender.catalog_index_status()
+    assert status["items"] == len(MOCK_DATA)
+    assert status["rebuilding"] is False
+
+
+def test_empty_cache_result_is_cached():
+    async def scenario():
+        assert hybrid_recommender.get_catalog_index(MOCK_DATA) is None
+        await hybrid_recommender._rebuild_task
+        first_task = hybrid_recommender._rebuild_task
+        assert hybrid_recommender.get_catalog_index(MOCK_DATA) is None
+        return first_task is hybrid_recommender._rebuild_task
+
+    assert asyncio.run(scenario())
+
+
+def test_cache_change_rebuilds_in_background_and_keeps_serving_old_index():
+    for item_id in range(1, 5):
+        embeddings_cache.set_embedding(str(item_id), "t", item_vector(item_id))
+
+    async def scenario():
+        old = await hybrid_recommender.rebuild_catalog_index(MOCK_DATA)
+        assert hybrid_recommender.get_catalog_index(MOCK_DATA) is old
+        assert hybrid_recommender._rebuild_task is None
+
+        embeddings_cache.set_embedding(str(BLADE_RUNNER), "t", item_vector(BLADE_RUNNER))
+        assert hybrid_recommender.get_catalog_index(MOCK_DATA) is old
+        await hybrid_recommender._rebuild_task
+        return old, hybrid_recommender.get_catalog_index(MOCK_DATA)
+
+    old, new = asyncio.run(scenario())
+    assert len(old) == 4
+    assert len(new) == 5
+
+
+def test_semantically_similar_item_is_recommended(fake_embed, monkeypatch):
+    monkeypatch.setattr(hybrid_recommender, "load_embeddings_for_user",
+                        lambda db, user_id: [item_vector(BLADE_RUNNER)])
+    req = RecommendRequest(preferences="qualquer coisa", limit=len(MOCK_DATA))
+    db = SessionLocal()
+
+    async def scenario():
+        baseline = await hybrid_recommender.hybrid_recommend(req, "u1", req.limit, db)
+        await hybrid_recommender.refresh_catalog_embeddings(MOCK_DATA)
+        return baseline, await hybrid_recommender.hybrid_recommend(req, "u1", req.limit, db)
+
+    baseline, recs = asyncio.run(scenario())
+    db.close()
+
+    assert BLADE_RUNNER not in [r.item.id for r in baseline]
+    match = next(r for r in recs if r.item.id == BLADE_RUNNER)
+    assert match.score > 0.5
+    assert "Semelhante aos seus gostos" in match.reason
+
+
+def test_save_feedback_invalidates_user_vector():
+    class FakeSession:
+        def add(self, obj): pass
+        def commit(self): pass
+        def refresh(self, obj): pass
+
+    user_vectors.set("u1", [[1.0, 0.0]])
+    save_feedback(FakeSession(), Feedback(user_id="u1", item_id="5", liked=True))
+    assert user_vectors.get("u1") is None
@@ -0,0 +1,174 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.tools.scheduler import BACKGROUND, INTERACTIVE, UpstreamScheduler
+
+
+@pytest.fixture(autouse=True)
+def fast_settings(monkeypatch):
+    monkeypatch.setattr(settings, "upstream_backoff_base_seconds", 0.001)
+    monkeypatch.setattr(settings, "upstream_backoff_max_seconds", 0.01)
+    monkeypatch.setattr(settings, "upstream_max_retries", 3)
+    monkeypatch.setattr(settings, "upstream_interactive_reserve", 0.2)
+    monkeypatch.setattr(settings, "upstream_interactive_deadline_seconds", 5.0)
+
+
+def make_scheduler(daily_quota=0):
+    s = UpstreamScheduler()
+    s.register("api", rate=100.0, burst=10, daily_quota=daily_quota, cache_ttl=60)
+    return s
+
+
+def http_error(status, text="", headers=None):
+    request = httpx.Request("GET", "https://example.test")
+    response = httpx.Response(status, request=request, text=text, headers=headers)
+    return httpx.HTTPStatusError("erro", request=request, response=response)
+
+
+def test_retries_429_then_succeeds():
+    s = make_scheduler()
+    calls = []
+
+    async def func():
+        calls.append(1)
+        if len(calls) < 3:
+            raise http_error(429, headers={"Retry-After": "0"})
+        return ["ok"]
+
+    assert asyncio.run(s.run("api", func, cache_key="q")) == ["ok"]
+    assert len(calls) == 3
+
+
+def test_persistent_5xx_falls_back_after_retries():
+    s = make_scheduler()
+    calls = []
+
+    async def func():
+        calls.append(1)
+        raise http_error(503)
+
+    assert asyncio.run(s.run("api", func, cache_key="q", fallback=[])) == []
+    assert len(calls) == settings.upstream_max_retries + 1
+
+
+def test_persistent_transport_error_falls_back():
+    s = make_scheduler()
+
+    async def func():
+        raise httpx.ConnectError("sem rede")
+
+    assert asyncio.run(s.run("api", func, fallback=[])) == []
+
+
+def test_non_retryable_4xx_is_raised():
+    s = make_scheduler()
+
+    async def func():
+        raise http_error(404)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(s.run("api", func, fallback=[]))
+
+
+def test_interactive_deadline_covers_retry_sleeps(monkeypatch):
+    monkeypatch.setattr(settings, "upstream_interactive_deadline_seconds", 0.2)
+    monkeypatch.setattr(settings, "upstream_backoff_max_seconds", 30.0)
+    s = make_scheduler()
+    calls = []
+
+    async def func():
+        calls.append(1)
+        raise http_error(429, headers={"Retry-After": "30"})
+
+    async def timed():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        result = await s.run("api", func, fallback=[])
+        return result, loop.time() - start
+
+    result, elapsed = asyncio.run(timed())
+    assert result == []
+    assert elapsed < 1
+    assert len(calls) == 1
+
+
+def test_interactive_deadline_covers_slow_calls(monkeypatch):
+    monkeypatch.setattr(settings, "upstream_interactive_deadline_seconds", 0.1)
+    s = make_scheduler()
+
+    async def func():
+        await asyncio.sleep(5)
+        return ["tarde"]
+
+    assert asyncio.run(asyncio.wait_for(s.run("api", func, fallback=[]), timeout=1)) == []
+
+
+def test_rate_limit_403_is_retried_without_exhausting_quota():
+    s = make_scheduler(daily_quota=1000)
+    calls = []
+
+    async def func():
+        calls.append(1)
+        if len(calls) == 1:
+            raise http_error(403, text='{"reason": "rateLimitExceeded"}')
+        return ["ok"]
+
+    assert asyncio.run(s.run("api", func, cost=100)) == ["ok"]
+    assert s.apis["api"].remaining() == 800
+
+
+def test_quota_exceeded_falls_back_to_stale_cache():
+    s = make_scheduler(daily_quota=1000)
+    api = s.apis["api"]
+    api.store("q", ["antigo"])
+    # Força a entrada a expirar (continua disponível como "stale")
+    api.cache["q"] = (api.cache["q"][0] - 3600, ["antigo"])
+
+    async def func():
+        raise http_error(403, text='{"reason": "quotaExceeded"}')
+
+    assert asyncio.run(s.run("api", func, cost=100, cache_key="q", fallback=[])) == ["antigo"]
+    assert api.remaining() == 0
+
+
+def test_background_refused_inside_interactive_reserve():
+    s = make_scheduler(daily_quota=100)
+    s.apis["api"].spend(75)
+
+    async def func():
+        return ["ok"]
+
+    # Restam 25 unidades; a reserva interativa é 20
+    assert asyncio.run(s.run("api", func, cost=10, lane=BACKGROUND, fallback=[])) == []
+    assert asyncio.run(s.run("api", func, cost=10, lane=INTERACTIVE, fallback=[])) == ["ok"]
+
+
+def test_background_yields_while_interactive_waiting():
+    s = make_scheduler()
+    api = s.apis["api"]
+
+    async def func():
+        return ["ok"]
+
+    async def scenario():
+        api.interactive_waiting = 1
+        task = asyncio.create_task(s.run("api", func, lane=BACKGROUND))
+        await asyncio.sleep(0.2)
+        assert not task.done()
+        api.interactive_waiting = 0
+        return await asyncio.wait_for(task, timeout=1)
+
+    assert asyncio.run(scenario()) == ["ok"]
+
+
+def test_cache_is_bounded_lru(monkeypatch):
+    monkeypatch.setattr(settings, "upstream_cache_max_entries", 2)
+    api = make_scheduler().apis["api"]
+    api.store("a", 1)
+    api.store("b", 2)
+    api.cached("a")
+    api.store("c", 3)
+    assert list(api.cache) == ["a", "c"]
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.vector_index import EmbeddingIndex, UserVectorCache
+
+
+@pytest.fixture(autouse=True)
+def index_settings(monkeypatch):
+    monkeypatch.setattr(settings, "embedding_recall_k", 10)
+    monkeypatch.setattr(settings, "embedding_recall_sample", 32)
+    monkeypatch.setattr(settings, "embedding_recall_target", 0.95)
+
+
+@pytest.fixture
+def catalog():
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(2000, 64)).astype(np.float32)
+    return [str(i) for i in range(len(vectors))], vectors
+
+
+def exact_top(vectors, query, k):
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return [str(i) for i in np.argsort(-(normed @ (query / np.linalg.norm(query))))[:k]]
+
+
+@pytest.mark.parametrize("mode", ["float16", "int8"])
+def test_quantized_search_matches_exact(catalog, mode):
+    ids, vectors = catalog
+    index = EmbeddingIndex(ids, vectors, mode=mode, rerank_candidates=50)
+    query = vectors[:3].mean(axis=0)
+
+    found = index.search(query)
+
+    assert [i for i, _ in found] == exact_top(vectors, query, 10)
+    assert index.recall >= 0.95
+    assert index.stats()["recall_k"] == 10
+
+
+def test_int8_uses_quarter_of_float32_memory(catalog):
+    ids, vectors = catalog
+    full = EmbeddingIndex(ids, vectors, mode="none")
+    int8 = EmbeddingIndex(ids, vectors, mode="int8")
+    assert int8.nbytes() < full.nbytes() / 3
+
+
+def test_calibration_grows_candidates_until_target(catalog, monkeypatch):
+    monkeypatch.setattr(settings, "embedding_recall_target", 1.0)
+    ids, vectors = catalog
+    index = EmbeddingIndex(ids, vectors, mode="int8", rerank_candidates=10)
+    assert index.recall == 1.0
+    assert index.rerank_candidates > 10
+
+
+def test_zero_rerank_candidates_is_clamped(catalog, monkeypatch):
+    monkeypatch.setattr(settings, "embedding_recall_target", 1.0)
+    monkeypatch.setattr(settings, "embedding_rerank_candidates", 0)
+    ids, vectors = catalog
+    index = EmbeddingIndex(ids[:500], vectors[:500], mode="int8", rerank_candidates=0)
+    assert index.recall == 1.0
+    assert index.rerank_candidates >= settings.embedding_recall_k
+
+
+def test_user_vector_cache_quantizes_and_invalidates(monkeypatch):
+    monkeypatch.setattr(settings, "embedding_quantization", "int8")
+    cache = UserVectorCache()
+    likes = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]]
+
+    vector = cache.set("u1", likes)
+
+    assert cache._entries["u1"][1].dtype == np.int8
+    np.testing.assert_allclose(cache.get("u1"), vector)
+    np.testing.assert_allclose(vector / np.linalg.norm(vector), [0.7071, 0.7071, 0.0], atol=1e-2)
+    cache.invalidate("u1")
+    assert cache.get("u1") is None